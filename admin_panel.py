@@ -3,10 +3,17 @@ Streamlit Admin Dashboard for License Management
 Run with: streamlit run admin_panel.py
 """
 
+import gc
 import os
+import functools
 import streamlit as st
 from datetime import datetime, date, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import altair as alt
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import uuid
@@ -21,36 +28,59 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize Supabase connection
-@st.cache_resource
-def init_supabase():
-    """Initialize Supabase client for read operations."""
-    try:
-        # Try Streamlit secrets first (for production), then environment variables
-        supabase_url = None
-        supabase_key = None
-        
+def _read_credentials():
+    """Read Supabase credentials once per run (Streamlit secrets first, then env)."""
+    creds = {}
+    for key in ('SUPABASE_URL', 'SUPABASE_KEY', 'SUPABASE_SERVICE_KEY'):
+        value = None
         try:
-            # Try to access secrets (works in Streamlit Cloud)
+            # st.secrets re-checks the TOML on every access; touch it once per key
             if hasattr(st, 'secrets') and st.secrets:
-                supabase_url = st.secrets.get('SUPABASE_URL')
-                supabase_key = st.secrets.get('SUPABASE_KEY')
+                value = st.secrets.get(key)
         except (KeyError, AttributeError, TypeError):
             pass
-        
         # Fallback to environment variables (for local development)
-        if not supabase_url:
-            supabase_url = os.getenv('SUPABASE_URL')
-        if not supabase_key:
-            supabase_key = os.getenv('SUPABASE_KEY')
-        
+        creds[key] = value or os.getenv(key)
+    return creds
+
+_SECRETS = _read_credentials()
+
+def _tune_http_pool(client):
+    """Swap the PostgREST session for one with a keep-alive pool so
+    back-to-back REST calls reuse sockets instead of re-doing TCP/TLS."""
+    try:
+        import httpx
+        old_session = client.postgrest.session
+        client.postgrest.session = httpx.Client(
+            base_url=old_session.base_url,
+            headers=old_session.headers,
+            limits=httpx.Limits(
+                max_keepalive_connections=15,
+                max_connections=30,
+                keepalive_expiry=30.0
+            ),
+            timeout=httpx.Timeout(10.0),
+        )
+    except Exception:
+        # Best effort — keep the default pool if client internals differ
+        pass
+    return client
+
+# Initialize Supabase connection
+@st.cache_resource
+def init_supabase():
+    """Initialize Supabase client for read operations."""
+    try:
+        supabase_url = _SECRETS.get('SUPABASE_URL')
+        supabase_key = _SECRETS.get('SUPABASE_KEY')
+
         if not supabase_url or not supabase_key:
             st.error("⚠️ SUPABASE_URL and SUPABASE_KEY must be set in Streamlit Secrets or .env file")
             st.info("Please add your Supabase credentials to Streamlit Secrets (Settings → Secrets)")
             st.stop()
             return None
         
-        return create_client(supabase_url, supabase_key)
+        return _tune_http_pool(create_client(supabase_url, supabase_key))
     except Exception as e:
         st.error(f"❌ Error initializing Supabase: {str(e)}")
         st.info("Please check your Supabase credentials in Streamlit Secrets")
@@ -61,29 +91,14 @@ def init_supabase():
 def init_service_client():
     """Initialize Supabase client using the service_role key for writes."""
     try:
-        # Try Streamlit secrets first (for production), then environment variables
-        supabase_url = None
-        service_key = None
-        
-        try:
-            # Try to access secrets (works in Streamlit Cloud)
-            if hasattr(st, 'secrets') and st.secrets:
-                supabase_url = st.secrets.get('SUPABASE_URL')
-                service_key = st.secrets.get('SUPABASE_SERVICE_KEY')
-        except (KeyError, AttributeError, TypeError):
-            pass
-        
-        # Fallback to environment variables (for local development)
-        if not supabase_url:
-            supabase_url = os.getenv('SUPABASE_URL')
-        if not service_key:
-            service_key = os.getenv('SUPABASE_SERVICE_KEY')
-        
+        supabase_url = _SECRETS.get('SUPABASE_URL')
+        service_key = _SECRETS.get('SUPABASE_SERVICE_KEY')
+
         if not supabase_url or not service_key:
             st.warning("⚠️ SUPABASE_SERVICE_KEY not found. License creation will fail. Please add it to Streamlit Secrets.")
             return None
         
-        return create_client(supabase_url, service_key)
+        return _tune_http_pool(create_client(supabase_url, service_key))
     except Exception as e:
         st.warning(f"⚠️ Error initializing service client: {str(e)}")
         return None
@@ -92,13 +107,27 @@ def init_service_client():
 supabase = init_supabase()
 service_client = init_service_client()
 
+@st.cache_resource
+def _freeze_gc():
+    """One-time GC tuning after startup: move long-lived init objects (clients,
+    module code, cached CSS) into the permanent generation so rerun-time
+    collections never rescan them. Auto-GC stays enabled for the short-lived
+    row dicts each rerun allocates."""
+    gc.collect()
+    gc.freeze()
+    return True
+
+_freeze_gc()
+
 # Show connection status
 if supabase is None:
     st.error("❌ Failed to connect to Supabase. Please check your configuration.")
     st.stop()
 
-# Custom CSS for better styling
-st.markdown("""
+# Custom CSS for better styling (built once per process, re-emitted per rerun)
+@st.cache_resource
+def _page_css() -> str:
+    return """
     <style>
     .main-header {
         font-size: 2.5rem;
@@ -125,7 +154,17 @@ st.markdown("""
         font-weight: bold;
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource
+def _page_footer() -> str:
+    return """
+    <div style='text-align: center; color: #666; padding: 1rem;'>
+        License Management System | Built with Streamlit & Supabase
+    </div>
+"""
+
+st.markdown(_page_css(), unsafe_allow_html=True)
 
 # Main Header
 st.markdown('<h1 class="main-header">🔐 License Management Dashboard</h1>', unsafe_allow_html=True)
@@ -150,14 +189,47 @@ page = st.sidebar.radio(
     ["📊 Dashboard", "➕ Create License", "👥 View All Licenses", "🔑 Control License Key", "✅ Manage License", "📈 Statistics"]
 )
 
+# One "today" per rerun so every row on a page is judged against the same date
+today = date.today()
+
 # Helper Functions
+
+# Columns the UI actually renders — fetching them explicitly keeps response
+# bodies small instead of pulling every column with select('*')
+LICENSE_COLUMNS = 'license_key,client_name,hwid,expiration_date,is_active,notes,created_at'
+
+@functools.lru_cache(maxsize=4096)
+def _parse_iso_date(s: str) -> date:
+    """Parse a 'YYYY-MM-DD...' string into a date.
+
+    Supabase always returns this fixed shape, so plain slicing beats the
+    fromisoformat state machine, and the LRU cache collapses repeat strings
+    (the same rows re-render constantly) to a dict lookup.
+    """
+    return date(int(s[:4]), int(s[5:7]), int(s[8:10]))
+
+def parse_exp_date(value):
+    """Parse an ISO expiration date (string or date) into a date, or None."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return _parse_iso_date(value)
+    return value
+
+def attach_exp_dates(rows):
+    """Parse each row's expiration_date once and stash it as row['_exp_date']."""
+    for row in rows:
+        row['_exp_date'] = parse_exp_date(row.get('expiration_date'))
+    return rows
+
+@st.cache_data(ttl=600, show_spinner=False)
 def get_all_licenses():
-    """Fetch all licenses from the database."""
+    """Fetch all licenses from the database (cached; writes invalidate)."""
     try:
         if supabase is None:
             return []
-        response = supabase.table('licenses').select('*').order('created_at', desc=True).execute()
-        return response.data if response.data else []
+        response = supabase.table('licenses').select(LICENSE_COLUMNS).order('created_at', desc=True).execute()
+        return attach_exp_dates(response.data) if response.data else []
     except Exception as e:
         error_msg = str(e)
         # Check if it's an API key error
@@ -172,17 +244,18 @@ def get_all_licenses():
             st.error(f"❌ Error fetching licenses: {error_msg}")
         return []
 
+@st.cache_data(ttl=600, show_spinner=False)
 def get_active_licenses():
-    """Fetch only active licenses."""
+    """Fetch only active licenses (cached; writes invalidate)."""
     try:
         if supabase is None:
             return []
         response = supabase.table('licenses')\
-            .select('*')\
+            .select(LICENSE_COLUMNS)\
             .eq('is_active', True)\
             .order('expiration_date', desc=False)\
             .execute()
-        return response.data if response.data else []
+        return attach_exp_dates(response.data) if response.data else []
     except Exception as e:
         error_msg = str(e)
         # Check if it's an API key error - don't show duplicate error
@@ -193,6 +266,128 @@ def get_active_licenses():
             st.error(f"❌ Error fetching active licenses: {error_msg}")
         return []
 
+@st.cache_data(ttl=600, show_spinner=False)
+def get_recent_licenses(n: int = 10):
+    """Fetch the n most recently created licenses (limit applied server-side)."""
+    try:
+        if supabase is None:
+            return []
+        response = supabase.table('licenses')\
+            .select(LICENSE_COLUMNS)\
+            .order('created_at', desc=True)\
+            .limit(n)\
+            .execute()
+        return attach_exp_dates(response.data) if response.data else []
+    except Exception as e:
+        st.error(f"❌ Error fetching recent licenses: {str(e)}")
+        return []
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_expiring_licenses(days: int = 30, day_ordinal: int = 0):
+    """Fetch active licenses expiring within the next `days` days, soonest first.
+
+    day_ordinal keys the cache to the calendar day (see search_licenses).
+    """
+    try:
+        if supabase is None:
+            return []
+        today = date.fromordinal(day_ordinal) if day_ordinal else date.today()
+        response = supabase.table('licenses')\
+            .select('client_name,expiration_date')\
+            .eq('is_active', True)\
+            .gt('expiration_date', today.isoformat())\
+            .lte('expiration_date', (today + timedelta(days=days)).isoformat())\
+            .order('expiration_date', desc=False)\
+            .execute()
+        return attach_exp_dates(response.data) if response.data else []
+    except Exception as e:
+        st.error(f"❌ Error fetching expiring licenses: {str(e)}")
+        return []
+
+# Rows per page on the View All Licenses page
+PAGE_SIZE = 50
+
+@st.cache_data(ttl=600, show_spinner=False)
+def search_licenses(filter_status: str = "All", search_term: str = "", page: int = 1, day_ordinal: int = 0):
+    """Fetch one page of licenses with filtering and search pushed down to PostgREST.
+
+    day_ordinal is part of the cache key so entries roll over at midnight
+    even with a long TTL.
+    """
+    try:
+        if supabase is None:
+            return []
+        query = supabase.table('licenses').select(LICENSE_COLUMNS)
+        today_iso = date.fromordinal(day_ordinal).isoformat() if day_ordinal else date.today().isoformat()
+
+        if filter_status == "Active":
+            query = query.eq('is_active', True).gte('expiration_date', today_iso)
+        elif filter_status == "Expired":
+            query = query.lt('expiration_date', today_iso)
+        elif filter_status == "Revoked":
+            query = query.eq('is_active', False)
+
+        if search_term:
+            # license_key is a uuid column, so substring search only applies to
+            # client_name; an exact key match is added when the term is a full UUID
+            term = search_term.strip().replace('%', '').replace(',', '')
+            try:
+                uuid.UUID(term)
+                query = query.or_(f"client_name.ilike.%{term}%,license_key.eq.{term}")
+            except ValueError:
+                query = query.ilike('client_name', f'%{term}%')
+
+        start = (page - 1) * PAGE_SIZE
+        response = query.order('created_at', desc=True).range(start, start + PAGE_SIZE - 1).execute()
+        return attach_exp_dates(response.data) if response.data else []
+    except Exception as e:
+        st.error(f"❌ Error searching licenses: {str(e)}")
+        return []
+
+@st.cache_data(ttl=600, show_spinner=False)
+def find_licenses(search: str = "", limit: int = 20):
+    """Typeahead lookup: return a small batch of licenses matching a client-name search."""
+    try:
+        if supabase is None:
+            return []
+        query = supabase.table('licenses')\
+            .select('license_key,client_name,is_active')\
+            .order('created_at', desc=True)
+        if search:
+            query = query.ilike('client_name', f"%{search.strip()}%")
+        response = query.limit(limit).execute()
+        return response.data if response.data else []
+    except Exception as e:
+        st.error(f"❌ Error searching licenses: {str(e)}")
+        return []
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_license_by_key(license_key: str):
+    """Fetch a single license row by its key (cached per key; writes invalidate)."""
+    try:
+        if supabase is None:
+            return None
+        response = supabase.table('licenses')\
+            .select(LICENSE_COLUMNS)\
+            .eq('license_key', license_key)\
+            .limit(1)\
+            .execute()
+        return attach_exp_dates(response.data)[0] if response.data else None
+    except Exception as e:
+        st.error(f"❌ Error fetching license: {str(e)}")
+        return None
+
+def clear_license_caches():
+    """Invalidate cached license reads after any write so the next rerun refetches."""
+    get_all_licenses.clear()
+    get_active_licenses.clear()
+    get_statistics.clear()
+    search_licenses.clear()
+    find_licenses.clear()
+    get_recent_licenses.clear()
+    get_expiring_licenses.clear()
+    get_license_by_key.clear()
+
 def create_license(client_name: str, duration_months: int, notes: Optional[str] = None) -> tuple:
     """Create a new license."""
     try:
@@ -200,8 +395,8 @@ def create_license(client_name: str, duration_months: int, notes: Optional[str]
         if service_client is None:
             return False, None, "Service role key is missing. Please add SUPABASE_SERVICE_KEY to Streamlit Secrets."
         
-        # Calculate expiration date
-        expiration_date = date.today() + timedelta(days=duration_months * 30)
+        # Calculate expiration date (calendar months, not 30-day blocks)
+        expiration_date = date.today() + relativedelta(months=duration_months)
         
         # Generate UUID license key
         license_key = str(uuid.uuid4())
@@ -216,6 +411,7 @@ def create_license(client_name: str, duration_months: int, notes: Optional[str]
         }).execute()
         
         if response.data:
+            clear_license_caches()
             return True, license_key, None
         else:
             return False, None, "Failed to create license - no data returned"
@@ -226,6 +422,61 @@ def create_license(client_name: str, duration_months: int, notes: Optional[str]
             error_msg = e.get('message', str(e))
         return False, None, error_msg
 
+def _uuid4_fast() -> str:
+    """Format a random version-4 UUID string straight from os.urandom.
+
+    Skips uuid.UUID's int conversion and __str__ machinery; only worth it on
+    the bulk path where thousands of keys are generated per click.
+    """
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40  # version 4
+    b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+@functools.lru_cache(maxsize=128)
+def _exp_for(months: int, today_ordinal: int) -> str:
+    """ISO expiration date `months` calendar months after the given day.
+
+    Cached so a bulk batch computes each distinct duration once instead of
+    allocating a relativedelta per row.
+    """
+    return (date.fromordinal(today_ordinal) + relativedelta(months=months)).isoformat()
+
+def create_licenses_bulk(entries: list) -> tuple:
+    """Create many licenses with one batched insert per 1000 rows.
+
+    entries is a list of (client_name, duration_months, notes) tuples.
+    Returns (success, created_rows, error).
+    """
+    try:
+        # MUST use service_client for INSERT operations (bypasses RLS)
+        if service_client is None:
+            return False, [], "Service role key is missing. Please add SUPABASE_SERVICE_KEY to Streamlit Secrets."
+
+        today_ordinal = date.today().toordinal()
+        payload = [{
+            'license_key': _uuid4_fast(),
+            'client_name': client_name,
+            'expiration_date': _exp_for(duration_months, today_ordinal),
+            'is_active': True,
+            'notes': notes
+        } for client_name, duration_months, notes in entries]
+
+        created = []
+        # Chunk at 1000 rows to keep individual request bodies bounded
+        for start in range(0, len(payload), 1000):
+            response = service_client.table('licenses').insert(payload[start:start + 1000]).execute()
+            if response.data:
+                created.extend(response.data)
+
+        if created:
+            clear_license_caches()
+            return True, created, None
+        return False, [], "Failed to create licenses - no data returned"
+    except Exception as e:
+        return False, [], str(e)
+
 def activate_license(license_key: str) -> tuple:
     """Activate a license by setting is_active to True."""
     try:
@@ -239,6 +490,7 @@ def activate_license(license_key: str) -> tuple:
             .execute()
         
         if response.data:
+            clear_license_caches()
             return True, f"License {license_key[:8]}... activated successfully!"
         else:
             return False, "License not found or already active"
@@ -246,11 +498,25 @@ def activate_license(license_key: str) -> tuple:
         return False, str(e)
 
 def extend_license(license_key: str, additional_months: int) -> tuple:
-    """Extend license expiration date by adding months."""
+    """Extend license expiration date by adding calendar months."""
     try:
         if service_client is None:
             return False, "Service role key is missing. Please add SUPABASE_SERVICE_KEY to Streamlit Secrets."
-        
+
+        # Preferred path: one atomic RPC (extend_license in supabase_functions.sql)
+        # instead of a SELECT + UPDATE round-trip pair
+        try:
+            response = service_client.rpc(
+                'extend_license',
+                {'k': license_key, 'm': additional_months}
+            ).execute()
+            if response.data:
+                clear_license_caches()
+                return True, f"License extended successfully! New expiration: {response.data}"
+        except Exception:
+            # Function not deployed on this project yet — fall back below
+            pass
+
         # Get current license
         response = service_client.table('licenses')\
             .select('expiration_date')\
@@ -260,19 +526,14 @@ def extend_license(license_key: str, additional_months: int) -> tuple:
         if not response.data:
             return False, "License not found"
         
-        current_expiration = response.data[0].get('expiration_date')
-        if current_expiration:
-            # Parse current expiration date
-            if isinstance(current_expiration, str):
-                current_date = datetime.fromisoformat(current_expiration.split('T')[0]).date()
-            else:
-                current_date = current_expiration
+        current_date = parse_exp_date(response.data[0].get('expiration_date'))
+        if current_date:
             
             # Add months to current expiration (or use today if expired)
             if current_date < date.today():
-                new_expiration = date.today() + timedelta(days=additional_months * 30)
+                new_expiration = date.today() + relativedelta(months=additional_months)
             else:
-                new_expiration = current_date + timedelta(days=additional_months * 30)
+                new_expiration = current_date + relativedelta(months=additional_months)
             
             # Update expiration date
             update_response = service_client.table('licenses')\
@@ -281,6 +542,7 @@ def extend_license(license_key: str, additional_months: int) -> tuple:
                 .execute()
             
             if update_response.data:
+                clear_license_caches()
                 return True, f"License extended successfully! New expiration: {new_expiration}"
             else:
                 return False, "Failed to update license"
@@ -302,6 +564,7 @@ def revoke_license(license_key: str) -> tuple:
             .execute()
         
         if response.data:
+            clear_license_caches()
             return True, "License revoked successfully"
         else:
             return False, "License not found or already revoked"
@@ -320,6 +583,7 @@ def delete_license(license_key: str) -> tuple:
             .execute()
         
         if response.data:
+            clear_license_caches()
             return True, "License deleted successfully"
         else:
             return False, "License not found"
@@ -338,6 +602,7 @@ def unlink_device(license_key: str) -> tuple:
             .execute()
         
         if response.data:
+            clear_license_caches()
             return True, "Device unlinked successfully. License can now be activated on another device."
         else:
             return False, "License not found"
@@ -349,7 +614,18 @@ def reset_license(license_key: str) -> tuple:
     try:
         if service_client is None:
             return False, "Service role key is missing. Please add SUPABASE_SERVICE_KEY to Streamlit Secrets."
-        
+
+        # Preferred path: one atomic RPC (reset_license in supabase_functions.sql)
+        # that folds the expired check into the UPDATE itself
+        try:
+            response = service_client.rpc('reset_license', {'k': license_key}).execute()
+            if response.data:
+                clear_license_caches()
+                return True, "License reset successfully: activated, device unlinked, and extended if expired."
+        except Exception:
+            # Function not deployed on this project yet — fall back below
+            pass
+
         # Get current license
         response = service_client.table('licenses')\
             .select('*')\
@@ -366,16 +642,11 @@ def reset_license(license_key: str) -> tuple:
         }
         
         # Check if expired and extend by 1 month if so
-        exp_date_str = license_data.get('expiration_date')
-        if exp_date_str:
-            if isinstance(exp_date_str, str):
-                exp_date = datetime.fromisoformat(exp_date_str.split('T')[0]).date()
-            else:
-                exp_date = exp_date_str
-            
+        exp_date = parse_exp_date(license_data.get('expiration_date'))
+        if exp_date:
             if exp_date < date.today():
                 # Extend by 1 month from today
-                updates['expiration_date'] = (date.today() + timedelta(days=30)).isoformat()
+                updates['expiration_date'] = (date.today() + relativedelta(months=1)).isoformat()
         
         # Apply updates
         update_response = service_client.table('licenses')\
@@ -384,48 +655,91 @@ def reset_license(license_key: str) -> tuple:
             .execute()
         
         if update_response.data:
+            clear_license_caches()
             return True, "License reset successfully: activated, device unlinked, and extended if expired."
         else:
             return False, "Failed to reset license"
     except Exception as e:
         return False, str(e)
 
-def get_statistics():
-    """Get license statistics."""
-    all_licenses = get_all_licenses()
-    active_licenses = get_active_licenses()
-    
-    today = date.today()
-    expired_count = 0
-    expiring_soon = 0  # Expiring in next 30 days
-    
-    for license in all_licenses:
-        if license.get('is_active'):
-            exp_date_str = license.get('expiration_date')
-            if exp_date_str:
-                if isinstance(exp_date_str, str):
-                    exp_date = datetime.fromisoformat(exp_date_str.split('T')[0]).date()
-                else:
-                    exp_date = exp_date_str
-                
-                if exp_date < today:
-                    expired_count += 1
-                elif (exp_date - today).days <= 30:
-                    expiring_soon += 1
-    
-    return {
-        'total': len(all_licenses),
-        'active': len(active_licenses),
-        'expired': expired_count,
-        'expiring_soon': expiring_soon,
-        'revoked': len(all_licenses) - len(active_licenses) - expired_count
-    }
+@st.cache_data(ttl=600, show_spinner=False)
+def get_statistics(day_ordinal: int = 0):
+    """Get license statistics in Postgres (aggregate RPC, count-query fallback).
+
+    day_ordinal keys the cache to the calendar day (see search_licenses).
+    """
+    empty = {'total': 0, 'active': 0, 'expired': 0, 'expiring_soon': 0, 'revoked': 0}
+    try:
+        if supabase is None:
+            return empty
+
+        # Preferred path: one aggregate RPC (license_stats in supabase_functions.sql)
+        # returns all four counts in a single round-trip
+        try:
+            response = supabase.rpc('license_stats').execute()
+            if response.data:
+                row = response.data[0] if isinstance(response.data, list) else response.data
+                total = row.get('total') or 0
+                active = row.get('active') or 0
+                return {
+                    'total': total,
+                    'active': active,
+                    'expired': row.get('expired') or 0,
+                    'expiring_soon': row.get('expiring_soon') or 0,
+                    'revoked': total - active
+                }
+        except Exception:
+            # Function not deployed on this project yet — fall back to count queries
+            pass
+
+        today = date.fromordinal(day_ordinal) if day_ordinal else date.today()
+        today_iso = today.isoformat()
+        soon_iso = (today + timedelta(days=30)).isoformat()
+
+        # count='exact' + head=True returns only the Content-Range header, no rows.
+        # The four counts are independent, so overlap their round-trips.
+        count_queries = {
+            'total': lambda: supabase.table('licenses')
+                .select('*', count='exact', head=True),
+            'active': lambda: supabase.table('licenses')
+                .select('*', count='exact', head=True)
+                .eq('is_active', True),
+            'expired': lambda: supabase.table('licenses')
+                .select('*', count='exact', head=True)
+                .eq('is_active', True)
+                .lt('expiration_date', today_iso),
+            'expiring_soon': lambda: supabase.table('licenses')
+                .select('*', count='exact', head=True)
+                .eq('is_active', True)
+                .gte('expiration_date', today_iso)
+                .lte('expiration_date', soon_iso),
+        }
+        with ThreadPoolExecutor(max_workers=len(count_queries)) as pool:
+            counts = dict(zip(
+                count_queries,
+                pool.map(lambda build: build().execute().count or 0, count_queries.values())
+            ))
+        total = counts['total']
+        active = counts['active']
+        expired = counts['expired']
+        expiring_soon = counts['expiring_soon']
+
+        return {
+            'total': total,
+            'active': active,
+            'expired': expired,
+            'expiring_soon': expiring_soon,
+            'revoked': total - active
+        }
+    except Exception as e:
+        st.error(f"❌ Error fetching statistics: {str(e)}")
+        return empty
 
 # Dashboard Page
 if page == "📊 Dashboard":
     st.header("📊 License Overview")
     
-    stats = get_statistics()
+    stats = get_statistics(today.toordinal())
     
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -448,27 +762,34 @@ if page == "📊 Dashboard":
     if 'api_key_error_shown' in st.session_state:
         del st.session_state['api_key_error_shown']
     
-    all_licenses = get_all_licenses()[:10]  # Show last 10
-    
-    if all_licenses:
-        for license in all_licenses:
-            with st.expander(f"📋 {license.get('client_name', 'Unknown')} - {license.get('license_key', 'N/A')[:8]}..."):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**License Key:** `{license.get('license_key')}`")
-                    st.write(f"**Client:** {license.get('client_name')}")
-                    st.write(f"**HWID:** {license.get('hwid') or 'Not activated'}")
-                with col2:
-                    exp_date = license.get('expiration_date')
-                    if exp_date:
-                        if isinstance(exp_date, str):
-                            exp_date = datetime.fromisoformat(exp_date.split('T')[0]).date()
-                        days_left = (exp_date - date.today()).days
-                        status = "🟢 Active" if license.get('is_active') and days_left > 0 else "🔴 Inactive"
-                        st.write(f"**Status:** {status}")
-                        st.write(f"**Expires:** {exp_date} ({days_left} days)")
-                    if license.get('notes'):
-                        st.write(f"**Notes:** {license.get('notes')}")
+    recent_licenses = get_recent_licenses(10)  # Show last 10
+
+    if recent_licenses:
+        # One st.dataframe instead of 10 expanders full of st.write widgets
+        df = pd.DataFrame(recent_licenses)
+        exp = pd.to_datetime(df['expiration_date'], errors='coerce')
+        days_left = (exp - pd.Timestamp(today)).dt.days
+        status = np.where(df['is_active'].fillna(False) & (days_left > 0), '🟢 Active', '🔴 Inactive')
+
+        recent_df = pd.DataFrame({
+            'Client': df['client_name'],
+            'License Key': df['license_key'],
+            'Status': status,
+            'Expires': exp,
+            'Days Left': days_left,
+            'HWID': df['hwid'].fillna('Not activated'),
+            'Notes': df['notes'],
+        })
+        st.dataframe(
+            recent_df,
+            column_config={
+                'License Key': st.column_config.TextColumn(max_chars=36),
+                'HWID': st.column_config.TextColumn(max_chars=20),
+                'Expires': st.column_config.DateColumn(format="YYYY-MM-DD"),
+            },
+            use_container_width=True,
+            hide_index=True,
+        )
     else:
         st.info("No licenses found. Create your first license using the sidebar.")
 
@@ -483,7 +804,7 @@ elif page == "➕ Create License":
         with col1:
             duration_months = st.number_input("Duration (Months) *", min_value=1, max_value=120, value=1)
         with col2:
-            duration_days = duration_months * 30
+            duration_days = ((today + relativedelta(months=duration_months)) - today).days
             st.write(f"**Total Days:** {duration_days}")
         
         notes = st.text_area("Notes (Optional)", placeholder="Additional notes about this license")
@@ -507,98 +828,153 @@ elif page == "➕ Create License":
                     else:
                         st.error(f"❌ Failed to create license: {error}")
 
+    st.divider()
+    st.subheader("📦 Bulk Create")
+    st.caption("One license per line: `client_name,duration_months[,notes]` — all rows are inserted in a single request.")
+
+    with st.form("bulk_create_form"):
+        bulk_input = st.text_area(
+            "Licenses to create",
+            placeholder="Acme Corp,12\nGlobex,6,trial extension"
+        )
+        bulk_submitted = st.form_submit_button("🔑 Generate License Keys", type="primary")
+
+    if bulk_submitted:
+        entries = []
+        line_errors = []
+        for line_no, line in enumerate(bulk_input.splitlines(), start=1):
+            if not line.strip():
+                continue
+            parts = [p.strip() for p in line.split(',', 2)]
+            if not parts[0]:
+                line_errors.append(f"Line {line_no}: client name is required")
+                continue
+            try:
+                months = int(parts[1]) if len(parts) > 1 and parts[1] else 1
+            except ValueError:
+                line_errors.append(f"Line {line_no}: invalid duration '{parts[1]}'")
+                continue
+            notes = parts[2] if len(parts) > 2 else None
+            entries.append((parts[0], months, notes))
+
+        if line_errors:
+            for err in line_errors:
+                st.error(f"⚠️ {err}")
+        elif not entries:
+            st.error("⚠️ Enter at least one client line!")
+        else:
+            with st.spinner(f"Creating {len(entries)} license(s)..."):
+                success, created, error = create_licenses_bulk(entries)
+
+            if success:
+                st.success(f"✅ Created {len(created)} license(s)!")
+                result_df = pd.DataFrame(created)[['client_name', 'license_key', 'expiration_date']]
+                st.dataframe(result_df, use_container_width=True, hide_index=True)
+                st.download_button(
+                    "⬇️ Download as CSV",
+                    result_df.to_csv(index=False),
+                    file_name="licenses.csv",
+                    mime="text/csv"
+                )
+            else:
+                st.error(f"❌ Failed to create licenses: {error}")
+
 # View All Licenses Page
 elif page == "👥 View All Licenses":
     st.header("👥 All Licenses")
+
+    # Fragment: filter changes rerun only this block, not the whole script
+    @st.fragment
+    def licenses_view():
     
-    # Filter options
-    col1, col2 = st.columns(2)
-    with col1:
-        filter_status = st.selectbox("Filter by Status", ["All", "Active", "Expired", "Revoked"])
-    with col2:
-        search_term = st.text_input("🔍 Search (Client Name or License Key)", "")
-    
-    # Fetch licenses
-    all_licenses = get_all_licenses()
-    
-    # Apply filters
-    filtered_licenses = all_licenses
-    if filter_status != "All":
-        today = date.today()
-        if filter_status == "Active":
-            filtered_licenses = [l for l in all_licenses if l.get('is_active')]
-            filtered_licenses = [l for l in filtered_licenses if 
-                               datetime.fromisoformat(l.get('expiration_date', '').split('T')[0]).date() >= today]
-        elif filter_status == "Expired":
-            filtered_licenses = [l for l in all_licenses 
-                               if datetime.fromisoformat(l.get('expiration_date', '').split('T')[0]).date() < today]
-        elif filter_status == "Revoked":
-            filtered_licenses = [l for l in all_licenses if not l.get('is_active')]
-    
-    if search_term:
-        search_lower = search_term.lower()
-        filtered_licenses = [l for l in filtered_licenses 
-                           if search_lower in l.get('client_name', '').lower() 
-                           or search_lower in l.get('license_key', '').lower()]
-    
-    # Display licenses in a table
-    if filtered_licenses:
-        st.write(f"**Found {len(filtered_licenses)} license(s)**")
-        
-        # Display licenses in table format
-        for license in filtered_licenses:
-            exp_date_str = license.get('expiration_date', '')
-            if exp_date_str:
-                exp_date = datetime.fromisoformat(exp_date_str.split('T')[0]).date()
-                days_left = (exp_date - date.today()).days
-                status = "🟢 Active" if license.get('is_active') and days_left > 0 else "🔴 Expired" if days_left < 0 else "⚪ Revoked"
-            else:
-                status = "❓ Unknown"
-                days_left = 0
-            
-            with st.expander(f"{license.get('client_name', 'N/A')} - {status}"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**License Key:** `{license.get('license_key', 'N/A')}`")
-                    st.write(f"**Client:** {license.get('client_name', 'N/A')}")
-                    st.write(f"**HWID:** {license.get('hwid') or 'Not activated'}")
-                with col2:
-                    st.write(f"**Status:** {status}")
-                    st.write(f"**Expiration:** {license.get('expiration_date', 'N/A')}")
-                    st.write(f"**Days Left:** {days_left}")
-                    st.write(f"**Created:** {license.get('created_at', 'N/A')[:10] if license.get('created_at') else 'N/A'}")
-    else:
-        st.info("No licenses found matching your criteria.")
+        # Filter options in a form so the query reruns on submit, not on every keystroke
+        with st.form("filter_form"):
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                filter_status = st.selectbox("Filter by Status", ["All", "Active", "Expired", "Revoked"])
+            with col2:
+                search_term = st.text_input("🔍 Search (Client Name or License Key)", "")
+            with col3:
+                page_number = st.number_input("Page", min_value=1, value=1, step=1)
+            st.form_submit_button("Apply")
+
+        # Fetch one page of licenses (filtering and search run in Postgres, not Python)
+        filtered_licenses = search_licenses(filter_status, search_term, int(page_number), today.toordinal())
+
+        # Display licenses in a table (vectorized with pandas instead of a per-row loop)
+        if filtered_licenses:
+            st.write(f"**Found {len(filtered_licenses)} license(s)**")
+
+            df = pd.DataFrame(filtered_licenses)
+            exp = pd.to_datetime(df['expiration_date'], errors='coerce')
+            days_left = (exp - pd.Timestamp(today)).dt.days
+            status = np.where(
+                df['is_active'].fillna(False) & (days_left > 0), '🟢 Active',
+                np.where(days_left < 0, '🔴 Expired', '⚪ Revoked')
+            )
+
+            display_df = pd.DataFrame({
+                'Client': df['client_name'],
+                'License Key': df['license_key'],
+                'Status': status,
+                'Expiration': exp,
+                'Days Left': days_left,
+                'HWID': df['hwid'].fillna('Not activated'),
+                'Created': pd.to_datetime(df['created_at'], errors='coerce'),
+                'Notes': df['notes'],
+            })
+            # Let st.dataframe handle truncation and date formatting natively
+            st.dataframe(
+                display_df,
+                column_config={
+                    'License Key': st.column_config.TextColumn(max_chars=36),
+                    'HWID': st.column_config.TextColumn(max_chars=20),
+                    'Expiration': st.column_config.DateColumn(format="YYYY-MM-DD"),
+                    'Created': st.column_config.DateColumn(format="YYYY-MM-DD"),
+                },
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.info("No licenses found matching your criteria.")
+    licenses_view()
 
 # Control License Key Page (New dedicated page)
 elif page == "🔑 Control License Key":
     st.header("🔑 Control License Key")
     st.markdown("---")
     
-    # Get all licenses
-    all_licenses = get_all_licenses()
-    
-    if not all_licenses:
-        st.info("📋 No licenses found in database.")
-        st.info("💡 **Tip:** Create a license first using the '➕ Create License' page.")
-        if supabase is None:
-            st.error("❌ **Connection Issue:** Supabase client is not initialized. Please check your API keys.")
-        elif service_client is None:
-            st.warning("⚠️ **Service Key Missing:** You need SUPABASE_SERVICE_KEY to create licenses.")
+    # Typeahead search: fetch at most 20 matches instead of the whole table
+    search_query = st.text_input("🔍 Search by Client Name", "", key="control_license_search")
+    matching_licenses = find_licenses(search_query)
+
+    if not matching_licenses:
+        if search_query:
+            st.info("📋 No licenses matched your search.")
+        else:
+            st.info("📋 No licenses found in database.")
+            st.info("💡 **Tip:** Create a license first using the '➕ Create License' page.")
+            if supabase is None:
+                st.error("❌ **Connection Issue:** Supabase client is not initialized. Please check your API keys.")
+            elif service_client is None:
+                st.warning("⚠️ **Service Key Missing:** You need SUPABASE_SERVICE_KEY to create licenses.")
     else:
         # License Selection
         st.subheader("📋 Select License")
         license_options = {
-            f"{l.get('client_name')} - {l.get('license_key')[:36]}... ({'🟢 Active' if l.get('is_active') else '🔴 Inactive'})": l.get('license_key')
-            for l in all_licenses
+            f"{l['client_name']} - {l['license_key']} ({'🟢 Active' if l['is_active'] else '🔴 Inactive'})": l['license_key']
+            for l in matching_licenses
         }
-        
+
         selected_license_display = st.selectbox("Choose License to Control", list(license_options.keys()), key="control_license_select")
         selected_license_key = license_options[selected_license_display]
-        
-        # Get selected license details
-        selected_license = next(l for l in all_licenses if l.get('license_key') == selected_license_key)
-        
+
+        # Fetch only the chosen license for detail display
+        selected_license = get_license_by_key(selected_license_key)
+        if selected_license is None:
+            st.error("❌ Could not load the selected license. Please refresh and try again.")
+            st.stop()
+
         # Display License Info
         st.markdown("---")
         st.subheader("📊 License Information")
@@ -614,13 +990,9 @@ elif page == "🔑 Control License Key":
             """)
         
         with col_info2:
-            exp_date_str = selected_license.get('expiration_date')
-            if exp_date_str:
-                if isinstance(exp_date_str, str):
-                    exp_date = datetime.fromisoformat(exp_date_str.split('T')[0]).date()
-                else:
-                    exp_date = exp_date_str
-                days_left = (exp_date - date.today()).days
+            exp_date = selected_license.get('_exp_date')
+            if exp_date:
+                days_left = (exp_date - today).days
             else:
                 exp_date = None
                 days_left = 0
@@ -678,7 +1050,7 @@ elif page == "🔑 Control License Key":
         
         with col_dur1:
             extend_months = st.number_input("Add Months", min_value=1, max_value=120, value=1, step=1, key="extend_months_control")
-            st.caption(f"Will add {extend_months * 30} days to the license")
+            st.caption(f"Will extend the license by {extend_months} calendar month(s)")
         
         with col_dur2:
             st.write("")  # Spacing
@@ -770,21 +1142,25 @@ elif page == "🔑 Control License Key":
 elif page == "✅ Manage License":
     st.header("✅ Manage License")
     
-    # Get all licenses
-    all_licenses = get_all_licenses()
-    
-    if all_licenses:
+    # Typeahead search: fetch at most 20 matches instead of the whole table
+    search_query = st.text_input("🔍 Search by Client Name", "", key="manage_license_search")
+    matching_licenses = find_licenses(search_query)
+
+    if matching_licenses:
         license_options = {
-            f"{l.get('client_name')} - {l.get('license_key')[:36]}... ({'🟢 Active' if l.get('is_active') else '🔴 Inactive'})": l.get('license_key')
-            for l in all_licenses
+            f"{l['client_name']} - {l['license_key']} ({'🟢 Active' if l['is_active'] else '🔴 Inactive'})": l['license_key']
+            for l in matching_licenses
         }
-        
+
         selected_license_display = st.selectbox("Select License", list(license_options.keys()))
         selected_license_key = license_options[selected_license_display]
-        
-        # Show license details
-        selected_license = next(l for l in all_licenses if l.get('license_key') == selected_license_key)
-        
+
+        # Fetch only the chosen license for detail display
+        selected_license = get_license_by_key(selected_license_key)
+        if selected_license is None:
+            st.error("❌ Could not load the selected license. Please refresh and try again.")
+            st.stop()
+
         # License Details Card
         st.subheader("📋 License Details")
         col1, col2 = st.columns(2)
@@ -798,13 +1174,9 @@ elif page == "✅ Manage License":
             """)
         
         with col2:
-            exp_date_str = selected_license.get('expiration_date')
-            if exp_date_str:
-                if isinstance(exp_date_str, str):
-                    exp_date = datetime.fromisoformat(exp_date_str.split('T')[0]).date()
-                else:
-                    exp_date = exp_date_str
-                days_left = (exp_date - date.today()).days
+            exp_date = selected_license.get('_exp_date')
+            if exp_date:
+                days_left = (exp_date - today).days
             else:
                 exp_date = None
                 days_left = 0
@@ -864,7 +1236,7 @@ elif page == "✅ Manage License":
         
         with col_ext1:
             extend_months = st.number_input("Add Months", min_value=1, max_value=120, value=1, step=1, key="extend_months")
-            st.caption(f"Will add {extend_months * 30} days to the license")
+            st.caption(f"Will extend the license by {extend_months} calendar month(s)")
         
         with col_ext2:
             st.write("")  # Spacing
@@ -948,26 +1320,39 @@ elif page == "✅ Manage License":
                     if st.button("❌ Cancel", use_container_width=True):
                         st.rerun()
     else:
-        st.info("No licenses found in database.")
+        if search_query:
+            st.info("No licenses matched your search.")
+        else:
+            st.info("No licenses found in database.")
 
 # Statistics Page
 elif page == "📈 Statistics":
     st.header("📈 License Statistics")
-    
-    stats = get_statistics()
-    
+
+    stats = get_statistics(today.toordinal())
+
+    @st.cache_data(show_spinner=False)
+    def _build_dist_chart(active: int, expired: int, revoked: int):
+        """Build the distribution bar chart, cached on the three counts."""
+        chart_df = pd.DataFrame({
+            'Status': ['Active', 'Expired', 'Revoked'],
+            'Count': [active, expired, revoked],
+        })
+        return (
+            alt.Chart(chart_df)
+            .mark_bar()
+            .encode(x=alt.X('Status', sort=None), y='Count', color=alt.Color('Status', legend=None))
+        )
+
     # Visual statistics
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.subheader("License Distribution")
-        # Simple chart data without pandas
-        chart_data = {
-            'Active': stats['active'],
-            'Expired': stats['expired'], 
-            'Revoked': stats['revoked']
-        }
-        st.bar_chart(chart_data)
+        st.altair_chart(
+            _build_dist_chart(stats['active'], stats['expired'], stats['revoked']),
+            use_container_width=True,
+        )
     
     with col2:
         st.subheader("Quick Stats")
@@ -977,36 +1362,24 @@ elif page == "📈 Statistics":
         st.metric("Expiring Soon (30 days)", stats['expiring_soon'])
         st.metric("Revoked", stats['revoked'])
     
-    # Expiring soon list
-    if stats['expiring_soon'] > 0:
-        st.divider()
-        st.subheader("⚠️ Licenses Expiring Soon (Next 30 Days)")
-        all_licenses = get_all_licenses()
-        today = date.today()
-        expiring_licenses = []
-        
-        for license in all_licenses:
-            if license.get('is_active'):
-                exp_date_str = license.get('expiration_date')
-                if exp_date_str:
-                    exp_date = datetime.fromisoformat(exp_date_str.split('T')[0]).date()
+    # Expiring soon list (range filter + sort run server-side on the partial
+    # index); isolated in a fragment so it re-renders without replaying the
+    # rest of the page
+    @st.fragment
+    def expiring_panel():
+        if stats['expiring_soon'] > 0:
+            st.divider()
+            st.subheader("⚠️ Licenses Expiring Soon (Next 30 Days)")
+
+            for exp_license in get_expiring_licenses(30, today.toordinal()):
+                exp_date = exp_license.get('_exp_date')
+                if exp_date:
                     days_left = (exp_date - today).days
-                    if 0 < days_left <= 30:
-                        expiring_licenses.append({
-                            'Client': license.get('client_name'),
-                            'Days Left': days_left,
-                            'Expiration Date': exp_date
-                        })
-        
-        if expiring_licenses:
-            for exp_license in expiring_licenses:
-                st.warning(f"**{exp_license['Client']}** - Expires in **{exp_license['Days Left']} days** ({exp_license['Expiration Date']})")
+                    st.warning(f"**{exp_license.get('client_name')}** - Expires in **{days_left} days** ({exp_date})")
+
+    expiring_panel()
 
 # Footer
 st.divider()
-st.markdown("""
-    <div style='text-align: center; color: #666; padding: 1rem;'>
-        License Management System | Built with Streamlit & Supabase
-    </div>
-""", unsafe_allow_html=True)
+st.markdown(_page_footer(), unsafe_allow_html=True)
 
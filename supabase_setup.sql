@@ -21,11 +21,24 @@ CREATE TABLE IF NOT EXISTS licenses (
 CREATE INDEX IF NOT EXISTS idx_licenses_hwid ON licenses(hwid);
 
 -- Create an index on license_key for faster lookups
+-- license_key is a native uuid column (16-byte comparisons). If migrating an
+-- older deployment that stored it as text, convert it first:
+--   ALTER TABLE licenses ALTER COLUMN license_key TYPE uuid USING license_key::uuid;
 CREATE INDEX IF NOT EXISTS idx_licenses_license_key ON licenses(license_key);
 
 -- Create an index on expiration_date for filtering
 CREATE INDEX IF NOT EXISTS idx_licenses_expiration_date ON licenses(expiration_date);
 
+-- Composite index backing the status-filtered dashboard/statistics queries
+CREATE INDEX IF NOT EXISTS idx_licenses_active_exp ON licenses(is_active, expiration_date);
+
+-- Partial index for "active licenses ordered/filtered by expiration" scans
+CREATE INDEX IF NOT EXISTS idx_licenses_active_only ON licenses(expiration_date) WHERE is_active;
+
+-- Create a trigram index on client_name so ILIKE '%term%' searches use an index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_licenses_client_trgm ON licenses USING gin (client_name gin_trgm_ops);
+
 -- Create a function to automatically update the updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$